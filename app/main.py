@@ -1,39 +1,55 @@
 # app/main.py
-import threading
+import asyncio
 import time
-import json
-import io
 import csv
-from typing import Dict, Any, List, Literal
+import itertools
+from functools import lru_cache, partial
+from typing import Dict, Any, List, Literal, Set, Tuple
 
-from fastapi import FastAPI
-from fastapi.responses import HTMLResponse, StreamingResponse, JSONResponse, Response
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, StreamingResponse, ORJSONResponse, Response
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel, Field
+from starlette.concurrency import run_in_threadpool
+from pydantic import BaseModel, ConfigDict, Field
 from uuid import uuid4
 from inspect import signature, Parameter
 
+import orjson
+
 from pyteda.analysis.registry import ANALYSIS_REGISTRY
 
 from app.config import (
     DATABASE_URL,
     EVENT_TTL_SECONDS,
     CLEANUP_INTERVAL_SECONDS,
+    CLEANUP_BATCH_RUNS,
     EVENTS_FETCH_LIMIT,
+    CSV_FETCH_BATCH_SIZE,
     KEEPALIVE_SECONDS,
     POLL_INTERVAL_SECONDS,
+    WORKER_DB_POOL_MAX_SIZE,
 )
 
 from app.persistence.postgres import PostgresPersistence
-from app.services.run_service import run_worker
+from app.persistence.postgres_async import AsyncPostgresReader
+from app.services.run_service import get_method_pool, run_async, shutdown_method_pool
+from app.services.event_notifier import RunEventNotifier, listen_run_events
 
 # -----------------------------------------------------------------------------
 # App
 # -----------------------------------------------------------------------------
-app = FastAPI(title="TEDA Web Backend (Lorenz96 + Streaming + Postgres)")
+app = FastAPI(
+    title="TEDA Web Backend (Lorenz96 + Streaming + Postgres)",
+    default_response_class=ORJSONResponse,
+)
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
 p = PostgresPersistence(DATABASE_URL)
+# Async reads for the SSE endpoint (opened on startup)
+ap = AsyncPostgresReader(DATABASE_URL)
+
+# Wakes SSE streams on Postgres NOTIFY for their run (see listen_run_events)
+notifier = RunEventNotifier()
 
 # -----------------------------------------------------------------------------
 # Method metadata for UI (so frontend can show tuneable params)
@@ -102,49 +118,47 @@ METHOD_SCHEMA: Dict[str, Dict[str, Dict[str, Any]]] = {
 }
 
 
-def _infer_schema_from_signature(cls) -> Dict[str, Dict[str, Any]]:
+@lru_cache(maxsize=None)
+def _init_parameters(cls) -> Tuple[Parameter, ...]:
     """
-    Infer param schema from __init__ signature when possible.
-    Excludes: self, model, *args/**kwargs. Only simple scalar defaults are handled.
+    Tunable __init__ parameters of an analysis class, cached per class.
+    Excludes: self, model, *args/**kwargs. Empty when the signature can't be read.
     """
-    out: Dict[str, Dict[str, Any]] = {}
     try:
         sig = signature(cls.__init__)
-        for name, p_ in sig.parameters.items():
-            if name in ("self", "model", "kwargs"):
-                continue
-            if p_.kind in (Parameter.VAR_POSITIONAL, Parameter.VAR_KEYWORD):
-                continue
-
-            default = None if p_.default is Parameter.empty else p_.default
-
-            if isinstance(default, bool):
-                out[name] = {"type": "bool", "label": name}
-            elif isinstance(default, int):
-                out[name] = {"type": "int", "min": None, "step": 1, "label": name}
-            elif isinstance(default, float):
-                out[name] = {"type": "float", "min": None, "step": 0.01, "label": name}
-            else:
-                out[name] = {"type": "str", "label": name}
     except Exception:
-        pass
+        return ()
+    return tuple(
+        p_
+        for name, p_ in sig.parameters.items()
+        if name not in ("self", "model", "kwargs")
+        and p_.kind not in (Parameter.VAR_POSITIONAL, Parameter.VAR_KEYWORD)
+    )
+
+
+def _infer_schema_from_signature(cls) -> Dict[str, Dict[str, Any]]:
+    """
+    Infer param schema from __init__ signature when possible.
+    Only simple scalar defaults are handled.
+    """
+    out: Dict[str, Dict[str, Any]] = {}
+    for p_ in _init_parameters(cls):
+        name = p_.name
+        default = None if p_.default is Parameter.empty else p_.default
+
+        if isinstance(default, bool):
+            out[name] = {"type": "bool", "label": name}
+        elif isinstance(default, int):
+            out[name] = {"type": "int", "min": None, "step": 1, "label": name}
+        elif isinstance(default, float):
+            out[name] = {"type": "float", "min": None, "step": 0.01, "label": name}
+        else:
+            out[name] = {"type": "str", "label": name}
     return out
 
 
 def _infer_defaults_from_signature(cls) -> Dict[str, Any]:
-    out: Dict[str, Any] = {}
-    try:
-        sig = signature(cls.__init__)
-        for name, p_ in sig.parameters.items():
-            if name in ("self", "model", "kwargs"):
-                continue
-            if p_.kind in (Parameter.VAR_POSITIONAL, Parameter.VAR_KEYWORD):
-                continue
-            if p_.default is not Parameter.empty:
-                out[name] = p_.default
-    except Exception:
-        pass
-    return out
+    return {p_.name: p_.default for p_ in _init_parameters(cls) if p_.default is not Parameter.empty}
 
 
 # -----------------------------------------------------------------------------
@@ -155,6 +169,8 @@ class MethodSpec(BaseModel):
     Represents a single method instance to run.
     `id` must be unique within the run.
     """
+    model_config = ConfigDict(extra="forbid", frozen=True)
+
     id: str = Field(..., description="Unique id for this method instance")
     name: str = Field(..., description="Method name (must be registered in ANALYSIS_REGISTRY)")
     label: str = Field(..., description="Display label for UI/plots")
@@ -162,6 +178,8 @@ class MethodSpec(BaseModel):
 
 
 class RunRequest(BaseModel):
+    model_config = ConfigDict(extra="forbid", frozen=True)
+
     model: Literal["lorenz96"] = "lorenz96"
 
     # core
@@ -192,17 +210,72 @@ def startup():
     # Ensure DB schema exists
     p.apply_schema("app/persistence/schema.sql")
 
+
+async def _cleanup_loop():
     # Periodic cleanup: removes runs older than TTL (cascades events/methods/points)
-    def _cleanup_loop():
-        while True:
-            time.sleep(CLEANUP_INTERVAL_SECONDS)
-            try:
-                p.cleanup_old_runs(EVENT_TTL_SECONDS)
-            except Exception:
-                # avoid crashing cleanup thread
-                pass
+    while True:
+        await asyncio.sleep(CLEANUP_INTERVAL_SECONDS)
+        try:
+            await run_in_threadpool(p.cleanup_old_runs, EVENT_TTL_SECONDS, CLEANUP_BATCH_RUNS)
+        except Exception:
+            # avoid crashing the cleanup loop
+            pass
+
+
+@app.on_event("startup")
+async def start_cleanup():
+    app.state.cleanup_task = asyncio.create_task(_cleanup_loop())
+
+
+@app.on_event("shutdown")
+async def stop_cleanup():
+    app.state.cleanup_task.cancel()
+    try:
+        await app.state.cleanup_task
+    except asyncio.CancelledError:
+        pass
+
+
+@app.on_event("startup")
+async def start_event_listener():
+    await ap.open()
+    # One LISTEN connection per process feeds every SSE stream
+    app.state.event_listener = asyncio.create_task(listen_run_events(DATABASE_URL, notifier))
+
+
+@app.on_event("shutdown")
+async def stop_event_listener():
+    task = getattr(app.state, "event_listener", None)
+    if task is not None:
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    await ap.close()
+
+
+# Runs in flight (asyncio tasks, see run_async); cancelled on shutdown
+_run_tasks: Set[asyncio.Task] = set()
+_worker_persistence_factory = partial(PostgresPersistence, DATABASE_URL, min_size=1, max_size=WORKER_DB_POOL_MAX_SIZE)
+
+
+@app.on_event("startup")
+def start_method_pool():
+    # Method process pool shared by all runs (workers spawn on first submissions)
+    get_method_pool(_worker_persistence_factory)
 
-    threading.Thread(target=_cleanup_loop, daemon=True).start()
+
+@app.on_event("shutdown")
+async def stop_runs():
+    # Cancel runs still in flight: each marks itself failed once it resumes.
+    # The method processes are terminated before that (no await in between),
+    # so no method writes after its run's terminal event.
+    tasks = list(_run_tasks)
+    for task in tasks:
+        task.cancel()
+    shutdown_method_pool()
+    await asyncio.gather(*tasks, return_exceptions=True)
 
 
 # -----------------------------------------------------------------------------
@@ -214,15 +287,16 @@ def home():
         return f.read()
 
 
-@app.get("/api/methods")
-def list_methods():
+def _registry_version() -> int:
+    # Analyses only ever get added to the registry, so its size is a cheap version counter.
+    return len(ANALYSIS_REGISTRY)
+
+
+@lru_cache(maxsize=1)
+def _build_methods_payload(registry_version: int) -> Dict[str, Any]:
     """
-    Frontend depends on:
-      - methods
-      - defaults
-      - schema
-      - help
-      - requires_model
+    Method metadata is static for the lifetime of the process (registry + signatures),
+    so it is built once per registry version and reused by every /api/methods call.
     """
     methods = sorted(list(ANALYSIS_REGISTRY.keys()))
 
@@ -256,123 +330,185 @@ def list_methods():
     }
 
 
+@lru_cache(maxsize=1)
+def _methods_payload_bytes(registry_version: int) -> bytes:
+    # serialized once as well: the handler returns these bytes as-is
+    return orjson.dumps(_build_methods_payload(registry_version))
+
+
+@app.get("/api/methods")
+def list_methods():
+    """
+    Frontend depends on:
+      - methods
+      - defaults
+      - schema
+      - help
+      - requires_model
+    """
+    return Response(content=_methods_payload_bytes(_registry_version()), media_type="application/json")
+
+
+# Built at import (the registry is populated by the run_service imports) so
+# no request pays for the inspect.signature pass or the serialization.
+_methods_payload_bytes(_registry_version())
+
+
 @app.post("/api/runs")
-def create_run(req: RunRequest):
+async def create_run(req: RunRequest):
     if req.model != "lorenz96":
-        return JSONResponse(status_code=400, content={"error": "For now, only lorenz96 is enabled."})
+        return ORJSONResponse(status_code=400, content={"error": "For now, only lorenz96 is enabled."})
 
-    # validate method instances
-    seen = set()
-    for ms in req.methods:
-        if ms.id in seen:
-            return JSONResponse(status_code=400, content={"error": f"Duplicate method instance id: {ms.id}"})
-        seen.add(ms.id)
+    # validate method instances (the registry is a dict: membership is already a hash lookup)
+    ids = [ms.id for ms in req.methods]
+    if len(set(ids)) != len(ids):
+        # error path only: name the first repeated id
+        dup = next(i for k, i in enumerate(ids) if i in ids[:k])
+        return ORJSONResponse(status_code=400, content={"error": f"Duplicate method instance id: {dup}"})
 
-        if ms.name not in ANALYSIS_REGISTRY:
-            return JSONResponse(status_code=400, content={"error": f"Unknown method: {ms.name}"})
+    unknown = [ms.name for ms in req.methods if ms.name not in ANALYSIS_REGISTRY]
+    if unknown:
+        return ORJSONResponse(status_code=400, content={"error": f"Unknown method: {unknown[0]}"})
 
     run_id = str(uuid4())
+    # dumped once: the same dict is persisted and handed to the run
     req_dict = req.model_dump()
 
-    # persist run
-    p.create_run(run_id, req_dict)
-    p.add_event(
+    # persist run (run row + run_created event: one statement, one commit)
+    await run_in_threadpool(
+        p.create_run_with_event,
         run_id,
+        req_dict,
         "run_created",
         {"type": "run_created", "run_id": run_id, "request": req_dict, "ts": time.time()},
     )
 
-    # fire worker (thread inside THIS process)
-    t = threading.Thread(target=run_worker, args=(p, run_id, req_dict), daemon=True)
-    t.start()
+    # schedule the run on the event loop; its compute goes to the shared process pool
+    task = asyncio.create_task(run_async(p, run_id, req_dict, _worker_persistence_factory))
+    _run_tasks.add(task)
+    task.add_done_callback(_run_tasks.discard)
 
     return {"run_id": run_id, "status": "queued"}
 
 
 @app.get("/api/runs/{run_id}/events")
-def run_events(run_id: str, since: int = 0):
+async def run_events(request: Request, run_id: str, since: int = 0):
     """
     Server-Sent Events stream.
     - Client can reconnect with ?since=<last_event_id>
     - We always include payload["_event_id"] for client bookkeeping.
+    - The generator and its DB reads (AsyncPostgresReader) are async, so
+      Starlette streams it from the event loop without threadpool hops.
     """
-    run = p.get_run(run_id)
+    run = await ap.get_run(run_id)
     if not run:
-        return JSONResponse(status_code=404, content={"error": "run not found"})
+        return ORJSONResponse(status_code=404, content={"error": "run not found"})
 
-    def event_stream():
-        yield "event: hello\ndata: {}\n\n"
+    # The worker persists the terminal event before it marks the run finished,
+    # so for a run already finished here, running out of events means the
+    # client has everything (e.g. it reconnected past run_completed).
+    finished_at_start = run.get("status") in ("completed", "failed")
+
+    async def event_stream():
+        yield b"event: hello\ndata: {}\n\n"
         last_keepalive = time.time()
         last_id = int(since)
 
-        while True:
-            rows = p.fetch_events_since(run_id, last_id, limit=EVENTS_FETCH_LIMIT)
-
-            if rows:
-                for (eid, etype, payload) in rows:
-                    last_id = int(eid)
-                    payload["_event_id"] = last_id
-                    yield f"event: {etype}\ndata: {json.dumps(payload)}\n\n"
+        with notifier.subscribe(run_id) as sub:
+            while True:
+                # stop before touching the DB again once the client is gone
+                if await request.is_disconnected():
+                    return
 
-                    if etype in ("run_completed", "run_failed"):
-                        yield "event: done\ndata: {}\n\n"
+                # payloads arrive as JSON bytes with "_event_id" merged in by Postgres
+                rows = await ap.fetch_event_frames_since(run_id, last_id, EVENTS_FETCH_LIMIT)
+
+                if rows:
+                    # one chunk per fetched batch (up to EVENTS_FETCH_LIMIT events)
+                    chunk: List[bytes] = []
+                    finished = False
+                    for (eid, etype, payload) in rows:
+                        last_id = eid
+                        # no JSON parse/serialize: DB bytes go straight into the frame
+                        chunk.append(b"event: %s\ndata: %s\n\n" % (etype, payload))
+
+                        # run_completed / run_failed end the stream (no run status polling)
+                        if etype in (b"run_completed", b"run_failed"):
+                            chunk.append(b"event: done\ndata: {}\n\n")
+                            finished = True
+                            break
+
+                    yield b"".join(chunk)
+                    if finished:
                         return
 
-            else:
-                # keepalive ping
-                if time.time() - last_keepalive > KEEPALIVE_SECONDS:
-                    yield "event: keepalive\ndata: {}\n\n"
-                    last_keepalive = time.time()
+                else:
+                    if finished_at_start:
+                        yield b"event: done\ndata: {}\n\n"
+                        return
 
-                # If run already finished but no more events, end.
-                run2 = p.get_run(run_id)
-                if run2 and run2.get("status") in ("completed", "failed"):
-                    yield "event: done\ndata: {}\n\n"
-                    return
+                    # keepalive ping
+                    if time.time() - last_keepalive > KEEPALIVE_SECONDS:
+                        yield b"event: keepalive\ndata: {}\n\n"
+                        last_keepalive = time.time()
 
-                time.sleep(POLL_INTERVAL_SECONDS)
+                    # Block until Postgres NOTIFYs a new event for the run (from any
+                    # process); the timeout only bounds keepalives and covers a
+                    # listener reconnect.
+                    await sub.wait(POLL_INTERVAL_SECONDS)
 
     return StreamingResponse(event_stream(), media_type="text/event-stream")
 
 
+class _Echo:
+    """File-like sink for csv.writer: writerow() returns the formatted line."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
 @app.get("/api/runs/{run_id}/csv")
 def download_run_csv(run_id: str):
     run = p.get_run(run_id)
     if not run:
-        return JSONResponse(status_code=404, content={"error": "run not found"})
-
-    rows = p.fetch_points_for_run(run_id)
-    if not rows:
-        return JSONResponse(status_code=400, content={"error": "no point data yet"})
+        return ORJSONResponse(status_code=404, content={"error": "run not found"})
 
     methods = p.get_methods(run_id)
+    w = csv.writer(_Echo())
 
-    buf = io.StringIO()
-    w = csv.writer(buf)
-
-    # long format
-    w.writerow(["run_id", "method_id", "name", "label", "step", "t", "error_b", "error_a"])
-
-    for r in rows:
-        mid = r["method_id"]
+    # "run_id,method_id,name,label," per method, quoted once by csv.writer;
+    # the numeric columns never need quoting and are formatted directly
+    def _row_prefix(mid: str) -> str:
         md = methods.get(mid, {})
-        w.writerow(
-            [
-                r["run_id"],
-                mid,
-                md.get("name", ""),
-                md.get("label", ""),
-                r["step"],
-                r["t"],
-                r["error_b"],
-                r["error_a"],
-            ]
-        )
-
-    content = buf.getvalue().encode("utf-8")
+        return w.writerow([run_id, mid, md.get("name", ""), md.get("label", "")])[:-2] + ","
+
+    prefixes = {mid: _row_prefix(mid) for mid in methods}
+
+    # server-side cursor: rows arrive in batches while the response streams
+    batches = p.iter_points_for_run(run_id, CSV_FETCH_BATCH_SIZE)
+    first = next(batches, None)
+    if first is None:
+        return ORJSONResponse(status_code=400, content={"error": "no point data yet"})
+
+    def csv_stream():
+        try:
+            # long format
+            yield w.writerow(["run_id", "method_id", "name", "label", "step", "t", "error_b", "error_a"])
+
+            # one chunk per DB batch
+            for rows in itertools.chain((first,), batches):
+                out: List[str] = []
+                for (_, mid, step, t, eb, ea) in rows:
+                    prefix = prefixes.get(mid) or prefixes.setdefault(mid, _row_prefix(mid))
+                    out.append(f"{prefix}{step},{float(t)!r},{float(eb)!r},{float(ea)!r}\r\n")
+                yield "".join(out)
+        finally:
+            # release the cursor's connection even if the client disconnects mid-stream
+            batches.close()
+
     filename = f"teda_run_{run_id[:8]}.csv"
-    return Response(
-        content=content,
+    return StreamingResponse(
+        csv_stream(),
         media_type="text/csv",
         headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
@@ -382,6 +518,7 @@ def download_run_csv(run_id: str):
 def get_run(run_id: str):
     run = p.get_run(run_id)
     if not run:
-        return JSONResponse(status_code=404, content={"error": "run not found"})
+        return ORJSONResponse(status_code=404, content={"error": "run not found"})
     run["methods"] = p.get_methods(run_id)
-    return run
+    # plain JSON types from the DB: serialize directly, skipping jsonable_encoder
+    return ORJSONResponse(run)
@@ -1,12 +1,13 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional, List, Tuple
+from typing import Any, Dict, Iterator, Optional, List, Tuple
 
 class Persistence(ABC):
     @abstractmethod
     def apply_schema(self, schema_sql_path: str) -> None: ...
 
+    # the run row and its first event as one atomic write; returns the event id
     @abstractmethod
-    def create_run(self, run_id: str, request: Dict[str, Any]) -> None: ...
+    def create_run_with_event(self, run_id: str, request: Dict[str, Any], ev_type: str, payload: Dict[str, Any]) -> int: ...
 
     @abstractmethod
     def set_run_status(self, run_id: str, status: str, error: Optional[str] = None, finished: bool = False) -> None: ...
@@ -14,6 +15,17 @@ class Persistence(ABC):
     @abstractmethod
     def add_event(self, run_id: str, ev_type: str, payload: Dict[str, Any]) -> int: ...
 
+    # add_event only while the run is unfinished; None once finish_run committed
+    @abstractmethod
+    def add_event_if_running(self, run_id: str, ev_type: str, payload: Dict[str, Any]) -> Optional[int]: ...
+
+    # finished status + terminal event as one atomic write (methods still
+    # running become 'cancelled'); returns the event id
+    @abstractmethod
+    def finish_run(self, run_id: str, status: str, ev_type: str, payload: Dict[str, Any], error: Optional[str] = None) -> int: ...
+
+    # upsert_method / insert_points_many write only while the run is unfinished;
+    # False once finish_run committed
     @abstractmethod
     def upsert_method(
         self,
@@ -25,10 +37,11 @@ class Persistence(ABC):
         status: str,
         metrics: Optional[Dict[str, Any]] = None,
         runtime_sec: Optional[float] = None,
-    ) -> None: ...
+    ) -> bool: ...
 
+    # rows: (step, t, error_b, error_a), written in one batch
     @abstractmethod
-    def insert_point(self, run_id: str, method_id: str, step: int, t: float, error_b: float, error_a: float) -> None: ...
+    def insert_points_many(self, run_id: str, method_id: str, rows: List[Tuple[int, float, float, float]]) -> bool: ...
 
     @abstractmethod
     def get_run(self, run_id: str) -> Optional[Dict[str, Any]]: ...
@@ -36,11 +49,10 @@ class Persistence(ABC):
     @abstractmethod
     def get_methods(self, run_id: str) -> Dict[str, Any]: ...
 
+    # batches of (run_id, method_id, step, t, error_b, error_a), ordered by method_id, step
     @abstractmethod
-    def fetch_events_since(self, run_id: str, since_id: int, limit: int = 200) -> List[Tuple[int, str, Dict[str, Any]]]: ...
-
-    @abstractmethod
-    def fetch_points_for_run(self, run_id: str) -> List[Dict[str, Any]]: ...
+    def iter_points_for_run(self, run_id: str, batch_size: int = 1000) -> Iterator[List[Tuple[Any, ...]]]: ...
 
+    # deletes expired runs batch_size at a time
     @abstractmethod
-    def cleanup_old_runs(self, ttl_seconds: int) -> None: ...
+    def cleanup_old_runs(self, ttl_seconds: int, batch_size: int = 50) -> None: ...
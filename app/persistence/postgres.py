@@ -1,30 +1,137 @@
-from typing import Any, Dict, Optional, List, Tuple
+from typing import Any, Dict, Iterator, Optional, List, Tuple
 
+import orjson
 import psycopg
 from psycopg_pool import ConnectionPool
 
+from app.config import (
+    DB_POOL_CHECK,
+    DB_POOL_MAX_IDLE_SECONDS,
+    DB_POOL_MAX_SIZE,
+    DB_POOL_MIN_SIZE,
+    DB_PREPARE_THRESHOLD,
+)
+
 from .base import Persistence
 
+
+def _json_dumps(obj: Any) -> bytes:
+    # orjson encodes NumPy arrays/scalars natively, so payloads may carry
+    # ndarray slices without a .tolist() round trip.
+    return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+def _jsonb(obj: Any) -> psycopg.types.json.Jsonb:
+    return psycopg.types.json.Jsonb(obj, dumps=_json_dumps)
+
+
+# JSON/JSONB columns are parsed with orjson too (process-wide: every
+# connection, sync and async, loads payloads this way)
+psycopg.types.json.set_json_loads(orjson.loads)
+
+
+# pg_advisory_xact_lock key held while applying schema.sql
+SCHEMA_LOCK_ID = 7_464_459_896_001
+
+
+# Read queries (SQL_GET_RUN is shared with the async reader, postgres_async.py)
+SQL_GET_RUN = "SELECT run_id, status, created_at, finished_at, request_json, error FROM runs WHERE run_id=%s"
+
+
+# Points of a run in CSV order (served by uq_points_run_method_step)
+SQL_POINTS_FOR_RUN = """
+    SELECT run_id, method_id, step, t, error_b, error_a
+    FROM points
+    WHERE run_id=%s
+    ORDER BY method_id, step
+"""
+
+
+def run_from_row(row: Tuple[Any, ...]) -> Dict[str, Any]:
+    return {
+        "run_id": row[0],
+        "status": row[1],
+        "created_at": row[2].timestamp() if row[2] else None,
+        "finished_at": row[3].timestamp() if row[3] else None,
+        "request": row[4],
+        "error": row[5],
+    }
+
+
+# -------------------------
+# Cursor-level statements
+# -------------------------
+def _add_event(cur: psycopg.Cursor, run_id: str, ev_type: str, payload: Dict[str, Any]) -> int:
+    cur.execute(
+        """
+        INSERT INTO events(run_id, type, payload_json)
+        VALUES (%s, %s, %s)
+        RETURNING id
+        """,
+        (run_id, ev_type, _jsonb(payload)),
+    )
+    return int(cur.fetchone()[0])
+
+
+def _create_run_with_event(
+    cur: psycopg.Cursor, run_id: str, request: Dict[str, Any], ev_type: str, payload: Dict[str, Any]
+) -> int:
+    # one statement: the run row and its first event in a single round trip
+    cur.execute(
+        """
+        WITH r AS (
+          INSERT INTO runs(run_id, status, request_json) VALUES (%s, %s, %s)
+          RETURNING run_id
+        )
+        INSERT INTO events(run_id, type, payload_json)
+        SELECT r.run_id, %s, %s FROM r
+        RETURNING id
+        """,
+        (run_id, "queued", _jsonb(request), ev_type, _jsonb(payload)),
+    )
+    return int(cur.fetchone()[0])
+
+
+def _get_run(cur: psycopg.Cursor, run_id: str) -> Optional[Dict[str, Any]]:
+    cur.execute(SQL_GET_RUN, (run_id,))
+    row = cur.fetchone()
+    return run_from_row(row) if row else None
+
+
 class PostgresPersistence(Persistence):
-    def __init__(self, dsn: str):
-        self.pool = ConnectionPool(conninfo=dsn, min_size=1, max_size=10, open=True)
+    def __init__(
+        self,
+        dsn: str,
+        min_size: int = DB_POOL_MIN_SIZE,
+        max_size: int = DB_POOL_MAX_SIZE,
+    ):
+        self.pool = ConnectionPool(
+            conninfo=dsn,
+            min_size=min(min_size, max_size),
+            max_size=max_size,
+            max_idle=DB_POOL_MAX_IDLE_SECONDS,
+            # autocommit: single-statement writes skip BEGIN/COMMIT; multi-statement
+            # work opens an explicit conn.transaction()
+            kwargs={"autocommit": True, "prepare_threshold": DB_PREPARE_THRESHOLD},
+            check=ConnectionPool.check_connection if DB_POOL_CHECK else None,
+            open=True,
+        )
 
     def apply_schema(self, schema_sql_path: str) -> None:
         with open(schema_sql_path, "r", encoding="utf-8") as f:
             sql = f.read()
         with self.pool.connection() as conn:
-            with conn.cursor() as cur:
+            # serialize concurrent appliers (one per gunicorn worker): the
+            # trigger DDL deadlocks when two processes run it at once
+            with conn.transaction(), conn.cursor() as cur:
+                cur.execute("SELECT pg_advisory_xact_lock(%s)", (SCHEMA_LOCK_ID,))
                 cur.execute(sql)
-            conn.commit()
 
-    def create_run(self, run_id: str, request: Dict[str, Any]) -> None:
+    def create_run_with_event(self, run_id: str, request: Dict[str, Any], ev_type: str, payload: Dict[str, Any]) -> int:
         with self.pool.connection() as conn:
             with conn.cursor() as cur:
-                cur.execute(
-                    "INSERT INTO runs(run_id, status, request_json) VALUES (%s, %s, %s)",
-                    (run_id, "queued", psycopg.types.json.Jsonb(request)),
-                )
-            conn.commit()
+                ev_id = _create_run_with_event(cur, run_id, request, ev_type, payload)
+        return ev_id
 
     def set_run_status(self, run_id: str, status: str, error: Optional[str] = None, finished: bool = False) -> None:
         with self.pool.connection() as conn:
@@ -39,22 +146,52 @@ class PostgresPersistence(Persistence):
                         "UPDATE runs SET status=%s, error=%s WHERE run_id=%s",
                         (status, error, run_id),
                     )
-            conn.commit()
 
     def add_event(self, run_id: str, ev_type: str, payload: Dict[str, Any]) -> int:
         with self.pool.connection() as conn:
             with conn.cursor() as cur:
+                ev_id = _add_event(cur, run_id, ev_type, payload)
+        return ev_id
+
+    def add_event_if_running(self, run_id: str, ev_type: str, payload: Dict[str, Any]) -> Optional[int]:
+        with self.pool.connection() as conn:
+            with conn.cursor() as cur:
+                # The runs row lock is taken before the event id is drawn and
+                # held until commit, so the run's writers (parallel methods)
+                # commit in id order and SSE's `id > last_id` never skips a
+                # late-committing lower id. It also waits for a concurrent
+                # finish_run and re-checks finished_at after it commits, so no
+                # event lands after the run's terminal event.
                 cur.execute(
                     """
                     INSERT INTO events(run_id, type, payload_json)
-                    VALUES (%s, %s, %s)
+                    SELECT run_id, %s, %s FROM runs
+                    WHERE run_id=%s AND finished_at IS NULL
+                    FOR NO KEY UPDATE
                     RETURNING id
                     """,
-                    (run_id, ev_type, psycopg.types.json.Jsonb(payload)),
+                    (ev_type, _jsonb(payload), run_id),
                 )
-                ev_id = cur.fetchone()[0]
-            conn.commit()
-        return int(ev_id)
+                row = cur.fetchone()
+        return int(row[0]) if row else None
+
+    def finish_run(self, run_id: str, status: str, ev_type: str, payload: Dict[str, Any], error: Optional[str] = None) -> int:
+        with self.pool.connection() as conn:
+            with conn.transaction(), conn.cursor() as cur:
+                # status first: the row lock orders this against add_event_if_running
+                # (and its event id after theirs)
+                cur.execute(
+                    "UPDATE runs SET status=%s, error=%s, finished_at=NOW() WHERE run_id=%s",
+                    (status, error, run_id),
+                )
+                # methods still running (siblings of a failed method, killed
+                # on shutdown) write nothing more: their writes check finished_at
+                cur.execute(
+                    "UPDATE methods SET status='cancelled' WHERE run_id=%s AND status='running'",
+                    (run_id,),
+                )
+                ev_id = _add_event(cur, run_id, ev_type, payload)
+        return ev_id
 
     def upsert_method(
         self,
@@ -66,63 +203,62 @@ class PostgresPersistence(Persistence):
         status: str,
         metrics: Optional[Dict[str, Any]] = None,
         runtime_sec: Optional[float] = None,
-    ) -> None:
+    ) -> bool:
         with self.pool.connection() as conn:
             with conn.cursor() as cur:
+                # FOR SHARE: like add_event_if_running, nothing is written once
+                # finish_run has committed (no id order to keep here)
                 cur.execute(
                     """
                     INSERT INTO methods(run_id, method_id, name, label, params_json, status, metrics_json, runtime_sec)
-                    VALUES (%s,%s,%s,%s,%s,%s,%s,%s)
+                    SELECT run_id, %s, %s, %s, %s, %s, %s::jsonb, %s::float8 FROM runs
+                    WHERE run_id=%s AND finished_at IS NULL
+                    FOR SHARE
                     ON CONFLICT (run_id, method_id) DO UPDATE SET
                       status=EXCLUDED.status,
                       metrics_json=EXCLUDED.metrics_json,
                       runtime_sec=EXCLUDED.runtime_sec
                     """,
                     (
-                        run_id,
                         method_id,
                         name,
                         label,
-                        psycopg.types.json.Jsonb(params or {}),
+                        _jsonb(params or {}),
                         status,
-                        (psycopg.types.json.Jsonb(metrics) if metrics is not None else None),
+                        (_jsonb(metrics) if metrics is not None else None),
                         runtime_sec,
+                        run_id,
                     ),
                 )
-            conn.commit()
+                return cur.rowcount > 0
 
-    def insert_point(self, run_id: str, method_id: str, step: int, t: float, error_b: float, error_a: float) -> None:
+    def insert_points_many(self, run_id: str, method_id: str, rows: List[Tuple[int, float, float, float]]) -> bool:
+        if not rows:
+            return True
+        steps, ts, errors_b, errors_a = (list(col) for col in zip(*rows))
         with self.pool.connection() as conn:
             with conn.cursor() as cur:
+                # one statement per batch: the columns travel as four arrays and
+                # unnest() expands them server-side (no per-row statements);
+                # guarded on the unfinished run like upsert_method
                 cur.execute(
                     """
                     INSERT INTO points(run_id, method_id, step, t, error_b, error_a)
-                    VALUES (%s,%s,%s,%s,%s,%s)
+                    SELECT r.run_id, %s, u.*
+                    FROM runs r, unnest(%s::int[], %s::float8[], %s::float8[], %s::float8[]) AS u
+                    WHERE r.run_id=%s AND r.finished_at IS NULL
+                    FOR SHARE OF r
                     ON CONFLICT (run_id, method_id, step) DO UPDATE SET
                       t=EXCLUDED.t, error_b=EXCLUDED.error_b, error_a=EXCLUDED.error_a
                     """,
-                    (run_id, method_id, int(step), float(t), float(error_b), float(error_a)),
+                    (method_id, steps, ts, errors_b, errors_a, run_id),
                 )
-            conn.commit()
+                return cur.rowcount > 0
 
     def get_run(self, run_id: str) -> Optional[Dict[str, Any]]:
         with self.pool.connection() as conn:
             with conn.cursor() as cur:
-                cur.execute(
-                    "SELECT run_id, status, created_at, finished_at, request_json, error FROM runs WHERE run_id=%s",
-                    (run_id,),
-                )
-                row = cur.fetchone()
-                if not row:
-                    return None
-                return {
-                    "run_id": row[0],
-                    "status": row[1],
-                    "created_at": row[2].timestamp() if row[2] else None,
-                    "finished_at": row[3].timestamp() if row[3] else None,
-                    "request": row[4],
-                    "error": row[5],
-                }
+                return _get_run(cur, run_id)
 
     def get_methods(self, run_id: str) -> Dict[str, Any]:
         with self.pool.connection() as conn:
@@ -147,56 +283,42 @@ class PostgresPersistence(Persistence):
                     }
                 return out
 
-    def fetch_events_since(self, run_id: str, since_id: int, limit: int = 200) -> List[Tuple[int, str, Dict[str, Any]]]:
+    def iter_points_for_run(self, run_id: str, batch_size: int = 1000) -> Iterator[List[Tuple[Any, ...]]]:
+        """
+        Streams a run's points through a server-side cursor, batch_size rows at a
+        time, so memory stays flat however long the run. Holds one pool
+        connection until the generator is exhausted or closed.
+        """
         with self.pool.connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    SELECT id, type, payload_json
-                    FROM events
-                    WHERE run_id=%s AND id > %s
-                    ORDER BY id ASC
-                    LIMIT %s
-                    """,
-                    (run_id, int(since_id), int(limit)),
-                )
-                rows = cur.fetchall()
-                return [(int(r[0]), r[1], r[2]) for r in rows]
+            # named cursors live inside a transaction
+            with conn.transaction(), conn.cursor(name=f"points_{run_id}") as cur:
+                cur.execute(SQL_POINTS_FOR_RUN, (run_id,))
+                while True:
+                    rows = cur.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield rows
 
-    def fetch_points_for_run(self, run_id: str) -> List[Dict[str, Any]]:
+    def cleanup_old_runs(self, ttl_seconds: int, batch_size: int = 50) -> None:
+        # A few expired runs per statement: each cascade (events/methods/points)
+        # commits on its own, keeping transactions, locks and WAL bursts bounded.
+        # The loop stops on a short batch, so LIMIT 0 would never end it.
+        batch_size = max(1, int(batch_size))
         with self.pool.connection() as conn:
             with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    SELECT run_id, method_id, step, t, error_b, error_a
-                    FROM points
-                    WHERE run_id=%s
-                    ORDER BY method_id, step
-                    """,
-                    (run_id,),
-                )
-                rows = cur.fetchall()
-                return [
-                    {
-                        "run_id": r[0],
-                        "method_id": r[1],
-                        "step": r[2],
-                        "t": float(r[3]),
-                        "error_b": float(r[4]),
-                        "error_a": float(r[5]),
-                    }
-                    for r in rows
-                ]
-
-    def cleanup_old_runs(self, ttl_seconds: int) -> None:
-        with self.pool.connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    DELETE FROM runs
-                    WHERE finished_at IS NOT NULL
-                      AND finished_at < (NOW() - (%s * INTERVAL '1 second'))
-                    """,
-                    (int(ttl_seconds),),
-                )
-            conn.commit()
+                while True:
+                    cur.execute(
+                        """
+                        DELETE FROM runs
+                        WHERE run_id IN (
+                          SELECT run_id FROM runs
+                          WHERE finished_at IS NOT NULL
+                            AND finished_at < (NOW() - (%s * INTERVAL '1 second'))
+                          ORDER BY finished_at
+                          LIMIT %s
+                        )
+                        """,
+                        (int(ttl_seconds), batch_size),
+                    )
+                    if cur.rowcount < batch_size:
+                        break
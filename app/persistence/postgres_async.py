@@ -0,0 +1,78 @@
+from typing import Any, Dict, Optional, List, Tuple
+
+from psycopg.adapt import Loader
+from psycopg_pool import AsyncConnectionPool
+
+from app.config import (
+    DB_POOL_CHECK,
+    DB_POOL_MAX_IDLE_SECONDS,
+    DB_POOL_MAX_SIZE,
+    DB_POOL_MIN_SIZE,
+    DB_PREPARE_THRESHOLD,
+)
+
+from .postgres import SQL_GET_RUN, run_from_row
+
+
+# SSE frames: payload with "_event_id" merged in by Postgres, as JSON text
+SQL_FETCH_EVENT_FRAMES_SINCE = """
+    SELECT id, type, (payload_json || jsonb_build_object('_event_id', id))::text
+    FROM events
+    WHERE run_id=%s AND id > %s
+    ORDER BY id ASC
+    LIMIT %s
+"""
+
+
+class _RawTextLoader(Loader):
+    """text columns as the raw UTF-8 bytes libpq received (no str decode)."""
+
+    def load(self, data) -> bytes:
+        return bytes(data)
+
+
+class AsyncPostgresReader:
+    """
+    Async read path for the SSE endpoint, so streams query Postgres from the
+    event loop instead of hopping to the threadpool on every wake-up.
+    get_run matches PostgresPersistence; events are read as raw SSE frames.
+    Writes stay synchronous.
+    """
+
+    def __init__(self, dsn: str):
+        # opened on app startup (an async pool needs a running loop)
+        self.pool = AsyncConnectionPool(
+            conninfo=dsn,
+            min_size=min(DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE),
+            max_size=DB_POOL_MAX_SIZE,
+            max_idle=DB_POOL_MAX_IDLE_SECONDS,
+            # autocommit: reads don't leave a transaction to roll back on checkin
+            kwargs={"autocommit": True, "prepare_threshold": DB_PREPARE_THRESHOLD},
+            check=AsyncConnectionPool.check_connection if DB_POOL_CHECK else None,
+            open=False,
+        )
+
+    async def open(self) -> None:
+        await self.pool.open()
+
+    async def close(self) -> None:
+        await self.pool.close()
+
+    async def get_run(self, run_id: str) -> Optional[Dict[str, Any]]:
+        async with self.pool.connection() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(SQL_GET_RUN, (run_id,))
+                row = await cur.fetchone()
+        return run_from_row(row) if row else None
+
+    async def fetch_event_frames_since(self, run_id: str, since_id: int, limit: int = 200) -> List[Tuple[int, bytes, bytes]]:
+        """
+        (id, type, payload JSON incl. "_event_id") with type/payload as raw bytes,
+        ready to be written into SSE frames without a JSON parse/serialize.
+        """
+        async with self.pool.connection() as conn:
+            async with conn.cursor() as cur:
+                # cursor-local: other queries on this connection still decode text to str
+                cur.adapters.register_loader("text", _RawTextLoader)
+                await cur.execute(SQL_FETCH_EVENT_FRAMES_SINCE, (run_id, int(since_id), int(limit)))
+                return [(int(r[0]), r[1], r[2]) for r in await cur.fetchall()]
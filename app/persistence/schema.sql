@@ -29,7 +29,8 @@ CREATE TABLE IF NOT EXISTS methods (
   PRIMARY KEY (run_id, method_id)
 );
 
-CREATE INDEX IF NOT EXISTS idx_methods_run_id ON methods(run_id);
+-- run_id lookups use the primary key (run_id, method_id)
+DROP INDEX IF EXISTS idx_methods_run_id;
 
 -- ============================================================================
 -- Events (SSE streaming)
@@ -43,9 +44,26 @@ CREATE TABLE IF NOT EXISTS events (
   ts           TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
 
-CREATE INDEX IF NOT EXISTS idx_events_run_id     ON events(run_id);
+-- fetch_events_since (WHERE run_id=? AND id > ? ORDER BY id): one range scan, no sort
 CREATE INDEX IF NOT EXISTS idx_events_run_id_id  ON events(run_id, id);
-CREATE INDEX IF NOT EXISTS idx_events_type       ON events(type);
+
+-- Redundant with idx_events_run_id_id (prefix) / never queried: only slowed inserts
+DROP INDEX IF EXISTS idx_events_run_id;
+DROP INDEX IF EXISTS idx_events_type;
+
+-- Wake SSE streams: NOTIFY run_events with the run_id on every new event.
+-- Delivered on commit, so listeners never see an event they cannot read yet;
+-- identical notifications within one transaction are folded by Postgres.
+CREATE OR REPLACE FUNCTION notify_run_event() RETURNS trigger AS $$
+BEGIN
+  PERFORM pg_notify('run_events', NEW.run_id);
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE TRIGGER events_notify
+AFTER INSERT ON events
+FOR EACH ROW EXECUTE FUNCTION notify_run_event();
 
 -- ============================================================================
 -- Points (time-series data)
@@ -62,13 +80,14 @@ CREATE TABLE IF NOT EXISTS points (
   ts        TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
 
-CREATE INDEX IF NOT EXISTS idx_points_run_id     ON points(run_id);
-CREATE INDEX IF NOT EXISTS idx_points_run_method ON points(run_id, method_id);
-
 -- 🔥 ESTA LINEA ARREGLA TU ERROR ACTUAL
 CREATE UNIQUE INDEX IF NOT EXISTS uq_points_run_method_step
 ON points(run_id, method_id, step);
 
+-- Prefixes of uq_points_run_method_step (which also serves the CSV ORDER BY)
+DROP INDEX IF EXISTS idx_points_run_id;
+DROP INDEX IF EXISTS idx_points_run_method;
+
 -- ============================================================================
 -- Cleanup helper
 -- Prefer finished_at if present; fallback to created_at
@@ -0,0 +1,102 @@
+# app/services/event_notifier.py
+import asyncio
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, Set
+
+import psycopg
+
+# Channel the events trigger NOTIFYs on (see schema.sql: notify_run_event)
+RUN_EVENTS_CHANNEL = "run_events"
+
+
+class RunSubscription:
+    """
+    Wake-up handle for one SSE stream on one run.
+    Notifications arriving while the stream is busy are remembered, so a
+    notify between "fetch returned nothing" and wait() is never lost.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self._loop = loop
+        self._event = asyncio.Event()
+
+    def _set_threadsafe(self) -> None:
+        self._loop.call_soon_threadsafe(self._event.set)
+
+    async def wait(self, timeout: float) -> bool:
+        """Wait for a notification; returns False on timeout."""
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self._event.clear()
+
+
+class RunEventNotifier:
+    """
+    In-process fan-out of "new event for run X" signals.
+    Fed by listen_run_events (Postgres NOTIFY); notify() may also be called
+    from any thread. Subscribers are asyncio streams on the server event loop.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subs: Dict[str, Set[RunSubscription]] = {}
+
+    def notify(self, run_id: str) -> None:
+        with self._lock:
+            subs = list(self._subs.get(run_id, ()))
+        for sub in subs:
+            try:
+                sub._set_threadsafe()
+            except RuntimeError:
+                # loop already closed (shutdown)
+                pass
+
+    def notify_all(self) -> None:
+        """Wake every subscriber (e.g. after notifications may have been missed)."""
+        with self._lock:
+            run_ids = list(self._subs)
+        for run_id in run_ids:
+            self.notify(run_id)
+
+    @contextmanager
+    def subscribe(self, run_id: str) -> Iterator[RunSubscription]:
+        sub = RunSubscription(asyncio.get_running_loop())
+        with self._lock:
+            self._subs.setdefault(run_id, set()).add(sub)
+        try:
+            yield sub
+        finally:
+            with self._lock:
+                subs = self._subs.get(run_id)
+                if subs is not None:
+                    subs.discard(sub)
+                    if not subs:
+                        del self._subs[run_id]
+
+
+async def listen_run_events(dsn: str, notifier: RunEventNotifier, retry_seconds: float = 1.0) -> None:
+    """
+    Forwards NOTIFY run_events (payload: run_id) to the notifier, forever.
+    One dedicated connection per app process, whatever the number of streams.
+    Reconnects on connection loss; run as a task and cancel it on shutdown.
+    """
+    while True:
+        try:
+            async with await psycopg.AsyncConnection.connect(dsn, autocommit=True) as conn:
+                await conn.execute(f"LISTEN {RUN_EVENTS_CHANNEL}")
+                # anything committed while we were not listening is picked up
+                # by the streams' own fetch once woken
+                notifier.notify_all()
+                async for n in conn.notifies():
+                    notifier.notify(n.payload)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # connection lost / DB restarting: streams fall back to their
+            # wait timeout until we are listening again
+            await asyncio.sleep(retry_seconds)
@@ -0,0 +1,96 @@
+# app/services/lorenz96.py
+from typing import Dict, Tuple
+
+import numpy as np
+from scipy.integrate import odeint
+
+from pyteda.models import Lorenz96
+
+# Localization geometry depends only on (n, r[, i]), never on the ensemble,
+# so it is shared process-wide (across methods and runs). Arrays are
+# read-only because every model instance hands out the same object.
+_NGB_CACHE: Dict[Tuple[int, float, int], np.ndarray] = {}
+_PRE_CACHE: Dict[Tuple[int, float, int], np.ndarray] = {}
+_DECORRELATION_CACHE: Dict[Tuple[int, float, str], np.ndarray] = {}
+_SHIFT_CACHE: Dict[int, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+
+
+def _shift_indices(n: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Cyclic indices (i+1, i-2, i-1) for the Lorenz96 stencil; cheaper than np.roll per RHS call."""
+    idx = _SHIFT_CACHE.get(n)
+    if idx is None:
+        i = np.arange(n)
+        idx = _SHIFT_CACHE[n] = tuple(_frozen(a) for a in ((i + 1) % n, (i - 2) % n, (i - 1) % n))
+    return idx
+
+
+def _scalar_radius(r):
+    """Cache key for a uniform radius; None for dict/array specs (not cached)."""
+    if isinstance(r, (int, float, np.integer, np.floating)) and not isinstance(r, bool):
+        return float(r)
+    return None
+
+
+def _frozen(arr: np.ndarray) -> np.ndarray:
+    arr.flags.writeable = False
+    return arr
+
+
+class FastLorenz96(Lorenz96):
+    """
+    pyteda Lorenz96 with app-side performance overrides.
+    Results are identical to the base model (propagate_ensemble up to the
+    integrator tolerance).
+    """
+
+    def lorenz96(self, x: np.ndarray, t: float) -> np.ndarray:
+        """Lorenz96 RHS as array ops (same per-component arithmetic as the base list comprehension)."""
+        ip1, im2, im1 = _shift_indices(self.n)
+        return (x[ip1] - x[im2]) * x[im1] - x + self.F
+
+    def _lorenz96_ensemble(self, x: np.ndarray, t: float, E: int) -> np.ndarray:
+        """Lorenz96 RHS for all members at once; x is the (n, E) state flattened row-major."""
+        ip1, im2, im1 = _shift_indices(self.n)
+        X = x.reshape(self.n, E)
+        dX = (X[ip1] - X[im2]) * X[im1] - X + self.F
+        return dX.ravel()
+
+    def propagate_ensemble(self, X: np.ndarray, T) -> np.ndarray:
+        """
+        Final states of all ensemble members (columns of X, shape (n, E)) after T.
+        One odeint call over the stacked system instead of one per member.
+        """
+        n, E = X.shape
+        x1 = odeint(self._lorenz96_ensemble, np.ravel(X), T, args=(E,))
+        return x1[-1].reshape(n, E)
+
+    def get_ngb(self, i: int, r) -> np.ndarray:
+        rk = _scalar_radius(r)
+        if rk is None:
+            return super().get_ngb(i, r)
+        key = (self.n, rk, int(i))
+        ngb = _NGB_CACHE.get(key)
+        if ngb is None:
+            ngb = _NGB_CACHE[key] = _frozen(super().get_ngb(i, r))
+        return ngb
+
+    def get_pre(self, i: int, r) -> np.ndarray:
+        rk = _scalar_radius(r)
+        if rk is None:
+            return super().get_pre(i, r)
+        key = (self.n, rk, int(i))
+        pre = _PRE_CACHE.get(key)
+        if pre is None:
+            pre = _PRE_CACHE[key] = _frozen(super().get_pre(i, r))
+        return pre
+
+    def create_decorrelation_matrix(self, r, combine: str = "mean") -> None:
+        rk = _scalar_radius(r)
+        if rk is None:
+            return super().create_decorrelation_matrix(r, combine=combine)
+        key = (self.n, rk, combine)
+        L = _DECORRELATION_CACHE.get(key)
+        if L is None:
+            super().create_decorrelation_matrix(r, combine=combine)
+            L = _DECORRELATION_CACHE[key] = _frozen(self._L)
+        self._L = L
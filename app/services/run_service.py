@@ -1,17 +1,36 @@
 # app/services/run_service.py
+import os
 import time
+import asyncio
 import math
-from typing import Any, Dict, List
+import base64
+import contextlib
+import zlib
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from threadpoolctl import threadpool_limits
 
-from pyteda.models import Lorenz96
-from pyteda.background import Background
 from pyteda.observation import Observation
-from pyteda.simulation import Simulation
 from pyteda.analysis.analysis_factory import AnalysisFactory
 from pyteda.analysis.registry import ANALYSIS_REGISTRY
 
 from app.persistence.base import Persistence
-from app.config import EMIT_PARTIAL_EVERY_N_STEPS
+from app.services.background import EnsembleBackground
+from app.services.lorenz96 import FastLorenz96
+from app.config import (
+    EMIT_PARTIAL_EVERY_N_STEPS,
+    PARTIAL_MIN_INTERVAL_SECONDS,
+    MAX_PARALLEL_METHODS,
+    PARTIAL_BATCH_ENCODING,
+    POINTS_BATCH_SIZE,
+    WORKER_BLAS_THREADS,
+)
 
 # Methods that need the physical model injected into the Analysis constructor
 LOCAL_METHODS_NEED_MODEL = {
@@ -22,210 +41,596 @@ LOCAL_METHODS_NEED_MODEL = {
     "enkf-shrinkage-precision",
 }
 
+# Rough relative cost per method (n=40, N=20; global EnKF variants ~1). Used
+# only to submit the slowest instances first so long ones do not start last
+# when a run has more instances than pool workers. Unlisted methods count as 1.
+METHOD_COST_HINT = {
+    "enkf-shrinkage-precision": 20,
+    "enkf-modified-cholesky": 10,
+    "letkf": 3,
+    "lenkf": 2,
+    "enkf-lw": 1.5,
+    "enkf-rblw": 1.5,
+}
+
+
+@dataclass(slots=True)
+class MethodInstance:
+    """One method instance of a run, unpacked once from the request dict."""
+    id: str
+    name: str
+    label: str
+    params: Dict[str, Any]
+
+    @classmethod
+    def from_dict(cls, ms: Dict[str, Any]) -> "MethodInstance":
+        return cls(id=ms["id"], name=ms["name"], label=ms.get("label", ms["name"]), params=ms.get("params") or {})
+
 
-def _series_stats(err: List[float]) -> Dict[str, float]:
-    """Simple summary stats + true RMSE for a scalar error time series."""
-    if not err:
+@dataclass
+class MethodSeries:
+    """
+    Per-method time series in structure-of-arrays layout.
+    Arrays are preallocated for the whole run; `n` is the number of filled steps.
+    """
+    t: np.ndarray
+    error_b: np.ndarray
+    error_a: np.ndarray
+    n: int = 0
+
+    @classmethod
+    def allocate(cls, nsteps: int) -> "MethodSeries":
+        return cls(
+            t=np.empty(nsteps, dtype=np.float64),
+            error_b=np.empty(nsteps, dtype=np.float64),
+            error_a=np.empty(nsteps, dtype=np.float64),
+        )
+
+
+def _series_stats(err: np.ndarray) -> Dict[str, float]:
+    """Simple summary stats + true RMSE for a scalar error time series (single NumPy pass per stat)."""
+    arr = np.asarray(err, dtype=np.float64)
+    n = arr.size
+    if n == 0:
         return {"final": float("nan"), "mean": float("nan"), "min": float("nan"), "rmse": float("nan")}
-    n = len(err)
-    mean = sum(err) / n
-    rmse = math.sqrt(sum((e * e) for e in err) / n)
-    return {"final": float(err[-1]), "mean": float(mean), "min": float(min(err)), "rmse": float(rmse)}
+    mean = arr.sum() / n
+    rmse = math.sqrt(np.dot(arr, arr) / n)
+    return {"final": float(arr[-1]), "mean": float(mean), "min": float(arr.min()), "rmse": float(rmse)}
 
 
-def run_worker(p: Persistence, run_id: str, req_dict: Dict[str, Any]) -> None:
+def _num_steps(end_time: float, obs_freq: float) -> int:
+    """Number of assimilation steps for t = 0, obs_freq, ... <= end_time."""
+    return int(math.floor(end_time / obs_freq + 1e-9)) + 1
+
+
+class RunCancelled(Exception):
+    """Raised in a method instance whose run already has its terminal event."""
+
+
+def _check_written(written: bool, run_id: str) -> None:
     """
-    Executes a run synchronously (called from a thread).
-    Persists: runs, methods, events (SSE), and points (CSV).
+    Method writes (events, points, method rows) only land while the run is
+    unfinished; once it has failed (sibling method, shutdown) the method stops
+    at its next write. finish_run already marked it 'cancelled'.
     """
-    try:
-        p.set_run_status(run_id, "running")
-        p.add_event(run_id, "run_started", {"type": "run_started", "run_id": run_id, "ts": time.time()})
-
-        # -------------------------
-        # Parse request
-        # -------------------------
-        ensemble_size = int(req_dict["ensemble_size"])
-        m = int(req_dict["m"])
-        std_obs = float(req_dict["std_obs"])
-        obs_freq = float(req_dict["obs_freq"])
-        end_time = float(req_dict["end_time"])
-        inf_fact = float(req_dict["inf_fact"])
-        n = int(req_dict["lorenz96_n"])
-        F = float(req_dict["lorenz96_F"])
-        methods = req_dict.get("methods", []) or []
-
-        # -------------------------
-        # Build model + observation
-        # -------------------------
-        model = Lorenz96(n=n, F=F)
-        observation = Observation(m=m, std_obs=std_obs)
-
-        # -------------------------
-        # Run methods sequentially
-        # -------------------------
-        for ms in methods:
-            method_name = ms["name"]
-            method_id = ms["id"]
-            label = ms.get("label", method_name)
-            params = ms.get("params", {}) or {}
-
-            if method_name not in ANALYSIS_REGISTRY:
-                raise ValueError(f"Unknown method: {method_name}")
-
-            p.upsert_method(run_id, method_id, method_name, label, params, status="running")
-            p.add_event(
-                run_id,
-                "method_started",
-                {
-                    "type": "method_started",
-                    "run_id": run_id,
-                    "method_id": method_id,
-                    "name": method_name,
-                    "label": label,
-                    "params": params,
-                    "ts": time.time(),
-                },
-            )
+    if not written:
+        raise RunCancelled(f"run {run_id} already finished")
+
+
+def _add_method_event(p: Persistence, run_id: str, ev_type: str, payload: Dict[str, Any]) -> int:
+    ev_id = p.add_event_if_running(run_id, ev_type, payload)
+    _check_written(ev_id is not None, run_id)
+    return ev_id
 
-            # -------------------------
-            # Background / Analysis / Simulation
-            # -------------------------
-            background = Background(model=model, ensemble_size=ensemble_size)
-
-            # CRITICAL FIX:
-            # Some Background implementations lazily create internal ensemble (e.g., background.Xb)
-            # only when get_initial_ensemble() is called. Without this, assimilation can fail.
-            _ = background.get_initial_ensemble()
-
-            analysis_kwargs = dict(params)
-            if method_name in LOCAL_METHODS_NEED_MODEL:
-                analysis_kwargs["model"] = model
-
-            analysis = AnalysisFactory(method=method_name, **analysis_kwargs).create_analysis()
-
-            sim = Simulation(
-                model,
-                background,
-                analysis,
-                observation,
-                params={"obs_freq": obs_freq, "end_time": end_time, "inf_fact": inf_fact},
-                log_level=None,
-            )
 
-            # -------------------------
-            # Streaming loop
-            # -------------------------
-            t0 = time.time()
-            error_a: List[float] = []
-            error_b: List[float] = []
-
-            xtk = model.get_initial_condition()
-            T = [0.0, obs_freq]
-            t = 0.0
-            step = 0
-
-            while t <= end_time + 1e-12:
-                # generate observation at truth state
-                observation.generate_observation(xtk)
-
-                # assimilation step (updates background/analysis internals)
-                Xak = analysis.perform_assimilation(background, observation)
-
-                # optional inflation
-                if inf_fact and inf_fact > 0:
-                    analysis.inflate_ensemble(inf_fact)
-
-                # states
-                xak = analysis.get_analysis_state()
-                xbk = background.get_background_state()
-
-                # errors
-                ea = float(sim.relative_error(xtk, xak))
-                eb = float(sim.relative_error(xtk, xbk))
-
-                error_a.append(ea)
-                error_b.append(eb)
-
-                # persist point for CSV
-                p.insert_point(run_id, method_id, step, float(t), eb, ea)
-
-                # stream partial event
-                if EMIT_PARTIAL_EVERY_N_STEPS > 0 and (step % EMIT_PARTIAL_EVERY_N_STEPS == 0):
-                    p.add_event(
-                        run_id,
-                        "partial",
-                        {
-                            "type": "partial",
-                            "run_id": run_id,
-                            "method_id": method_id,
-                            "name": method_name,
-                            "label": label,
-                            "step": step,
-                            "t": float(t),
-                            "error_a": ea,
-                            "error_b": eb,
-                            "ts": time.time(),
-                        },
-                    )
-
-                # forecast to next time
-                _ = background.forecast_step(Xak, time=[0.0, obs_freq])
-                xtk = model.propagate(xtk, T)
-
-                # increment
-                t = round(t + obs_freq, 10)
-                step += 1
-
-            runtime = time.time() - t0
-
-            # -------------------------
-            # Metrics + completion
-            # -------------------------
-            stats_a = _series_stats(error_a)
-            stats_b = _series_stats(error_b)
-
-            metrics = {
-                "final": stats_a["final"],
-                "mean": stats_a["mean"],
-                "min": stats_a["min"],
-                "rmse_a": stats_a["rmse"],
-                "rmse_b": stats_b["rmse"],
-                "background_final": stats_b["final"],
-                "background_mean": stats_b["mean"],
-                "background_min": stats_b["min"],
-            }
-
-            p.upsert_method(
-                run_id,
-                method_id,
-                method_name,
-                label,
-                params,
-                status="completed",
-                metrics=metrics,
-                runtime_sec=runtime,
+def _observation_seed(run_id: str) -> int:
+    """Stable per-run seed for the observation RNG."""
+    return zlib.crc32(run_id.encode("utf-8"))
+
+
+def _encode_f8(arr: np.ndarray) -> str:
+    """base64 of the little-endian float64 buffer (decoded client-side into a Float64Array)."""
+    return base64.b64encode(np.ascontiguousarray(arr, dtype="<f8").tobytes()).decode("ascii")
+
+
+def _partial_batch_template(run_id: str, method_id: str, method_name: str, label: str) -> Dict[str, Any]:
+    """Fields shared by every `partial_batch` event of a method instance (built once per method)."""
+    template = {
+        "type": "partial_batch",
+        "run_id": run_id,
+        "method_id": method_id,
+        "name": method_name,
+        "label": label,
+    }
+    if PARTIAL_BATCH_ENCODING == "f8-b64":
+        template["encoding"] = "f8-b64"
+    return template
+
+
+def _emit_partial_batch(
+    p: Persistence,
+    run_id: str,
+    template: Dict[str, Any],
+    series: MethodSeries,
+    start: int,
+) -> int:
+    """
+    Persist one `partial_batch` event for steps [start, series.n); returns the new start.
+    The payload references the series arrays, so it must be persisted before they change.
+    """
+    stop = series.n
+    t, error_a, error_b = series.t[start:stop], series.error_a[start:stop], series.error_b[start:stop]
+    if PARTIAL_BATCH_ENCODING == "f8-b64":
+        t, error_a, error_b = _encode_f8(t), _encode_f8(error_a), _encode_f8(error_b)
+    payload = dict(
+        template,
+        steps=list(range(start, stop)),
+        # ndarray slices: the persistence layer serializes NumPy directly
+        t=t,
+        error_a=error_a,
+        error_b=error_b,
+        ts=time.time(),
+    )
+    _add_method_event(p, run_id, "partial_batch", payload)
+    return stop
+
+
+def _flush_points(
+    p: Persistence,
+    run_id: str,
+    method_id: str,
+    series: MethodSeries,
+    start: int,
+) -> int:
+    """Persist the points of steps [start, series.n) in one batch; returns the new start."""
+    stop = series.n
+    written = p.insert_points_many(
+        run_id,
+        method_id,
+        list(
+            zip(
+                range(start, stop),
+                series.t[start:stop].tolist(),
+                series.error_b[start:stop].tolist(),
+                series.error_a[start:stop].tolist(),
             )
-            p.add_event(
-                run_id,
-                "method_completed",
-                {
-                    "type": "method_completed",
-                    "run_id": run_id,
-                    "method_id": method_id,
-                    "name": method_name,
-                    "label": label,
-                    "metrics": metrics,
-                    "runtime_sec": runtime,
-                    "ts": time.time(),
-                },
+        ),
+    )
+    _check_written(written, run_id)
+    return stop
+
+
+def _truth_trajectory(model: FastLorenz96, nsteps: int, obs_freq: float) -> np.ndarray:
+    """Truth states at every assimilation step, shape (nsteps, n). Identical for all methods of a run."""
+    x0 = model.get_initial_condition()
+    truth = np.empty((nsteps, x0.size), dtype=np.float64)
+    truth[0] = x0
+    # one forecast window, built once as the float64 array odeint wants
+    T = np.array([0.0, obs_freq])
+    for k in range(1, nsteps):
+        truth[k] = model.propagate(truth[k - 1], T)
+    return truth
+
+
+def _run_method(
+    p: Persistence,
+    run_id: str,
+    req_dict: Dict[str, Any],
+    spec: MethodInstance,
+    truth: np.ndarray,
+    X0: np.ndarray,
+) -> None:
+    """
+    Runs a single method instance end to end: streams partial batches,
+    persists its points, and records metrics on completion.
+    `truth` and `X0` (initial background ensemble) are shared by all
+    methods of the run, see _run_inputs.
+    Raises on failure; the caller owns the run status.
+    """
+    # -------------------------
+    # Parse request
+    # -------------------------
+    ensemble_size = int(req_dict["ensemble_size"])
+    m = int(req_dict["m"])
+    std_obs = float(req_dict["std_obs"])
+    obs_freq = float(req_dict["obs_freq"])
+    inf_fact = float(req_dict["inf_fact"])
+    n = int(req_dict["lorenz96_n"])
+    F = float(req_dict["lorenz96_F"])
+    # <= 0 disables partial_batch events (only method_started/method_completed)
+    emit_every = EMIT_PARTIAL_EVERY_N_STEPS
+    emit_partial = emit_every > 0
+    points_every = max(1, POINTS_BATCH_SIZE)
+
+    method_name = spec.name
+    method_id = spec.id
+    label = spec.label
+    params = spec.params
+
+    # -------------------------
+    # Build model + observation
+    # -------------------------
+    model = FastLorenz96(n=n, F=F)
+    # seeded from the run: every method of a run sees the same observation
+    # networks and noise draws (PCG64 Generator instead of a fresh unseeded one)
+    observation = Observation(m=m, std_obs=std_obs, rng=np.random.default_rng(_observation_seed(run_id)))
+
+    nsteps = truth.shape[0]
+    series = MethodSeries.allocate(nsteps)
+
+    _check_written(p.upsert_method(run_id, method_id, method_name, label, params, status="running"), run_id)
+    _add_method_event(
+        p,
+        run_id,
+        "method_started",
+        {
+            "type": "method_started",
+            "run_id": run_id,
+            "method_id": method_id,
+            "name": method_name,
+            "label": label,
+            "params": params,
+            "ts": time.time(),
+        },
+    )
+
+    # -------------------------
+    # Background / Analysis
+    # -------------------------
+    background = EnsembleBackground(model=model, ensemble_size=ensemble_size)
+
+    # CRITICAL FIX:
+    # Some Background implementations lazily create internal ensemble (e.g., background.Xb)
+    # only when get_initial_ensemble() is called. Without this, assimilation can fail.
+    # The run's shared initial ensemble stands in for that call (own copy per method).
+    background.set_initial_ensemble(X0)
+
+    analysis_kwargs = dict(params)
+    if method_name in LOCAL_METHODS_NEED_MODEL:
+        analysis_kwargs["model"] = model
+
+    analysis = AnalysisFactory(method=method_name, **analysis_kwargs).create_analysis()
+
+    # -------------------------
+    # Streaming loop
+    # -------------------------
+    t0 = time.time()
+    ser_t, ser_b, ser_a = series.t, series.error_b, series.error_a
+
+    # forecast window (odeint would convert a list on every call)
+    T = np.array([0.0, obs_freq])
+
+    # time axis from the integer step index (rounded once, vectorized, to keep
+    # values like 0.3 clean in CSV/events); no float accumulation in the loop
+    ser_t[:] = np.round(np.arange(nsteps) * obs_freq, 10)
+
+    # loop-invariant: decide on inflation once
+    do_inflate = bool(inf_fact) and inf_fact > 0
+
+    # error denominators: one norm per truth state, not two per step
+    truth_norms = [np.linalg.norm(x) for x in truth]
+    # scratch for state - truth, reused by both errors of every step
+    diff = np.empty(truth.shape[1], dtype=np.float64)
+
+    partial_template = _partial_batch_template(run_id, method_id, method_name, label)
+
+    # bound methods resolved once instead of per step
+    generate_observation = observation.generate_observation
+    perform_assimilation = analysis.perform_assimilation
+    inflate_ensemble = analysis.inflate_ensemble
+    get_analysis_state = analysis.get_analysis_state
+    get_background_state = background.get_background_state
+    forecast_step = background.forecast_step
+    norm, subtract = np.linalg.norm, np.subtract
+
+    # first step not yet streamed as a partial_batch event / persisted as a point
+    emitted = 0
+    flushed = 0
+    # monotonic time of the last partial_batch (throttles fast methods)
+    last_emit = -math.inf
+    monotonic = time.monotonic
+
+    for step in range(nsteps):
+        xtk = truth[step]
+
+        # generate observation at truth state
+        generate_observation(xtk)
+
+        # assimilation step (updates background/analysis internals)
+        Xak = perform_assimilation(background, observation)
+
+        # optional inflation
+        if do_inflate:
+            inflate_ensemble(inf_fact)
+
+        # states
+        xak = get_analysis_state()
+        xbk = get_background_state()
+
+        # errors: relative L2 error, as Simulation.relative_error computes it
+        nrm_t = truth_norms[step]
+        ser_a[step] = norm(subtract(xak, xtk, out=diff)) / nrm_t
+        ser_b[step] = norm(subtract(xbk, xtk, out=diff)) / nrm_t
+        series.n = step + 1
+
+        # persist points for CSV (batched), read back from the series
+        if series.n - flushed >= points_every:
+            flushed = _flush_points(p, run_id, method_id, series, flushed)
+
+        # stream partial batch (every N steps, at most one per
+        # PARTIAL_MIN_INTERVAL_SECONDS), read back from the series
+        if emit_partial and series.n - emitted >= emit_every and monotonic() - last_emit >= PARTIAL_MIN_INTERVAL_SECONDS:
+            emitted = _emit_partial_batch(p, run_id, partial_template, series, emitted)
+            last_emit = monotonic()
+
+        # forecast to next time
+        _ = forecast_step(Xak, time=T)
+
+    # flush the tail of the series
+    if series.n > flushed:
+        flushed = _flush_points(p, run_id, method_id, series, flushed)
+    if emit_partial and series.n > emitted:
+        emitted = _emit_partial_batch(p, run_id, partial_template, series, emitted)
+
+    runtime = time.time() - t0
+
+    # -------------------------
+    # Metrics + completion
+    # -------------------------
+    stats_a = _series_stats(series.error_a[:series.n])
+    stats_b = _series_stats(series.error_b[:series.n])
+
+    metrics = {
+        "final": stats_a["final"],
+        "mean": stats_a["mean"],
+        "min": stats_a["min"],
+        "rmse_a": stats_a["rmse"],
+        "rmse_b": stats_b["rmse"],
+        "background_final": stats_b["final"],
+        "background_mean": stats_b["mean"],
+        "background_min": stats_b["min"],
+    }
+
+    written = p.upsert_method(
+        run_id,
+        method_id,
+        method_name,
+        label,
+        params,
+        status="completed",
+        metrics=metrics,
+        runtime_sec=runtime,
+    )
+    _check_written(written, run_id)
+    _add_method_event(
+        p,
+        run_id,
+        "method_completed",
+        {
+            "type": "method_completed",
+            "run_id": run_id,
+            "method_id": method_id,
+            "name": method_name,
+            "label": label,
+            "metrics": metrics,
+            "runtime_sec": runtime,
+            "ts": time.time(),
+        },
+    )
+
+
+def _run_method_recorded(
+    p: Persistence,
+    run_id: str,
+    req_dict: Dict[str, Any],
+    spec: MethodInstance,
+    truth: np.ndarray,
+    X0: np.ndarray,
+) -> None:
+    """
+    _run_method, recording the instance as 'failed' when it raises (the caller
+    fails the run next, and finish_run cancels the siblings still running).
+    """
+    try:
+        _run_method(p, run_id, req_dict, spec, truth, X0)
+    except RunCancelled:
+        raise
+    except Exception:
+        # best effort: the original error is the one that fails the run
+        with contextlib.suppress(Exception):
+            p.upsert_method(run_id, spec.id, spec.name, spec.label, spec.params, status="failed")
+        raise
+
+
+# Persistence instance owned by a pool worker process (see _init_method_process)
+_worker_persistence: Optional[Persistence] = None
+
+_BLAS_THREAD_ENV_VARS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS")
+
+
+def _init_method_process(persistence_factory: Callable[[], Persistence]) -> None:
+    """
+    Pool initializer: each worker process opens its own DB connections and
+    runs BLAS single-threaded (parallelism comes from the pool, not from BLAS).
+    """
+    global _worker_persistence
+    blas_threads = str(max(1, WORKER_BLAS_THREADS))
+    for var in _BLAS_THREAD_ENV_VARS:
+        os.environ[var] = blas_threads
+    # NumPy's BLAS is already loaded by now (this module imports it), so the
+    # env vars alone are too late for it; limit the live thread pools as well
+    threadpool_limits(limits=int(blas_threads))
+    _worker_persistence = persistence_factory()
+
+
+def _run_method_in_process(
+    run_id: str,
+    req_dict: Dict[str, Any],
+    spec: MethodInstance,
+    truth: np.ndarray,
+    X0: np.ndarray,
+) -> None:
+    _run_method_recorded(_worker_persistence, run_id, req_dict, spec, truth, X0)
+
+
+# -------------------------
+# Method process pool (shared by all runs of this process)
+# -------------------------
+_method_pool: Optional[ProcessPoolExecutor] = None
+_method_pool_lock = threading.Lock()
+
+
+def get_method_pool(persistence_factory: Callable[[], Persistence]) -> ProcessPoolExecutor:
+    """
+    Returns the process pool shared by all runs, creating it on first use.
+    Its size (MAX_PARALLEL_METHODS) bounds the method instances executing at
+    once across concurrent runs; further submissions queue.
+    """
+    global _method_pool
+    with _method_pool_lock:
+        if _method_pool is None:
+            _method_pool = ProcessPoolExecutor(
+                max_workers=max(1, MAX_PARALLEL_METHODS),
+                # spawn: the parent holds DB pool threads
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_method_process,
+                initargs=(persistence_factory,),
             )
+        return _method_pool
+
+
+def _discard_method_pool(pool: ProcessPoolExecutor) -> None:
+    """Drops a broken pool so the next run starts a fresh one."""
+    global _method_pool
+    with _method_pool_lock:
+        if _method_pool is pool:
+            _method_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_method_pool() -> None:
+    """
+    Stops the pool without waiting for running work: its processes are
+    terminated (a method or truth rollout can take minutes), so nothing they
+    were doing can write after the caller fails their runs.
+    """
+    global _method_pool
+    with _method_pool_lock:
+        pool, _method_pool = _method_pool, None
+    if pool is None:
+        return
+    # ProcessPoolExecutor has no public way to stop busy workers (before 3.14)
+    processes = list((pool._processes or {}).values())
+    pool.shutdown(wait=False, cancel_futures=True)
+    for proc in processes:
+        proc.terminate()
+    for proc in processes:
+        proc.join(timeout=5)
+
+
+def _run_inputs(req_dict: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Method-independent inputs, built once per run and shared by all methods:
+    the truth trajectory and the initial background ensemble (so every
+    method starts from the same X0).
+    """
+    obs_freq = float(req_dict["obs_freq"])
+    model = FastLorenz96(n=int(req_dict["lorenz96_n"]), F=float(req_dict["lorenz96_F"]))
+    truth = _truth_trajectory(model, _num_steps(float(req_dict["end_time"]), obs_freq), obs_freq)
+    X0 = EnsembleBackground(model=model, ensemble_size=int(req_dict["ensemble_size"])).get_initial_ensemble()
+    return truth, X0
+
+
+def _check_methods(req_dict: Dict[str, Any]) -> List[MethodInstance]:
+    specs = [MethodInstance.from_dict(ms) for ms in req_dict.get("methods", []) or []]
+    for spec in specs:
+        if spec.name not in ANALYSIS_REGISTRY:
+            raise ValueError(f"Unknown method: {spec.name}")
+    return specs
+
+
+def _start_run(p: Persistence, run_id: str) -> None:
+    p.set_run_status(run_id, "running")
+    p.add_event(run_id, "run_started", {"type": "run_started", "run_id": run_id, "ts": time.time()})
 
-        # Run done
-        p.set_run_status(run_id, "completed", finished=True)
-        p.add_event(run_id, "run_completed", {"type": "run_completed", "run_id": run_id, "ts": time.time()})
+
+def _complete_run(p: Persistence, run_id: str) -> None:
+    # status and terminal event commit together
+    p.finish_run(run_id, "completed", "run_completed", {"type": "run_completed", "run_id": run_id, "ts": time.time()})
+
+
+def _fail_run(p: Persistence, run_id: str, error: str) -> None:
+    p.finish_run(
+        run_id,
+        "failed",
+        "run_failed",
+        {"type": "run_failed", "run_id": run_id, "error": error, "ts": time.time()},
+        error=error,
+    )
+
+
+def run_worker(p: Persistence, run_id: str, req_dict: Dict[str, Any]) -> None:
+    """
+    Executes a run synchronously in the calling thread, one method after the
+    other (scripts, debugging). The app uses run_async instead.
+    Persists: runs, methods, events (SSE), and points (CSV).
+    """
+    try:
+        _start_run(p, run_id)
+        methods = _check_methods(req_dict)
+        truth, X0 = _run_inputs(req_dict)
+        for spec in methods:
+            _run_method_recorded(p, run_id, req_dict, spec, truth, X0)
+        _complete_run(p, run_id)
 
     except Exception as e:
         # Mark failed and emit failure event
-        p.set_run_status(run_id, "failed", error=str(e), finished=True)
-        p.add_event(run_id, "run_failed", {"type": "run_failed", "run_id": run_id, "error": str(e), "ts": time.time()})
+        _fail_run(p, run_id, str(e))
+
+
+async def run_async(
+    p: Persistence,
+    run_id: str,
+    req_dict: Dict[str, Any],
+    persistence_factory: Callable[[], Persistence],
+) -> None:
+    """
+    Executes a run as a task on the server event loop. All compute (run inputs,
+    method instances) goes to the shared process pool
+    (get_method_pool); this coroutine only sequences the futures and records
+    run status, so the web process does no NumPy work and holds no thread
+    per run. Method instances run in parallel, each worker persisting
+    through its own connections (`persistence_factory`, picklable).
+    Cancelling the task (shutdown) fails the run. When the run fails, its
+    pending methods are cancelled and running ones, marked 'cancelled', stop
+    at their next write (see _check_written).
+    """
+    futures: List[Future] = []
+    try:
+        await asyncio.to_thread(_start_run, p, run_id)
+        methods = _check_methods(req_dict)
+
+        pool = get_method_pool(persistence_factory)
+        try:
+            truth, X0 = await asyncio.wrap_future(pool.submit(_run_inputs, req_dict))
+            # longest first (LPT): shortens the run when instances outnumber workers
+            by_cost = sorted(methods, key=lambda spec: METHOD_COST_HINT.get(spec.name, 1), reverse=True)
+            futures = [pool.submit(_run_method_in_process, run_id, req_dict, spec, truth, X0) for spec in by_cost]
+            await asyncio.gather(*(asyncio.wrap_future(f) for f in futures))
+        except BrokenProcessPool:
+            _discard_method_pool(pool)
+            raise
+
+        await asyncio.to_thread(_complete_run, p, run_id)
+
+    except asyncio.CancelledError:
+        for fut in futures:
+            fut.cancel()
+        await asyncio.to_thread(_fail_run, p, run_id, "cancelled: server shutting down")
+        raise
+
+    except Exception as e:
+        # cancel this run's pending methods only; the pool is shared
+        for fut in futures:
+            fut.cancel()
+        await asyncio.to_thread(_fail_run, p, run_id, str(e))
@@ -21,6 +21,14 @@ function escHtml(s){
     .replaceAll('"',"&quot;");
 }
 
+// base64 little-endian float64 buffer ("f8-b64" partial_batch arrays) -> Float64Array
+function decodeF8(b64){
+  const bin = atob(b64);
+  const bytes = new Uint8Array(bin.length);
+  for (let i = 0; i < bin.length; i++) bytes[i] = bin.charCodeAt(i);
+  return new Float64Array(bytes.buffer);
+}
+
 function uuidShort(prefix="m"){
   const t = Date.now().toString(36);
   const r = Math.random().toString(36).slice(2,7);
@@ -148,6 +156,7 @@ function openRunEvents(runId, onEvent){
     "run_started",
     "method_started",
     "partial",
+    "partial_batch",
     "method_completed",
     "run_completed",
     "run_failed",
@@ -936,11 +945,20 @@ async function createRun(){
       return;
     }
 
-    if (type === "partial"){
+    if (type === "partial" || type === "partial_batch"){
       const method_id = d.method_id;
 
       if (!st.seriesA[method_id]) st.seriesA[method_id] = [];
-      st.seriesA[method_id].push({ x: d.t, y: d.error_a });
+      if (type === "partial_batch"){
+        // several steps per event: parallel arrays t[] / error_a[]
+        const ts = (d.encoding === "f8-b64") ? decodeF8(d.t) : d.t;
+        const ea = (d.encoding === "f8-b64") ? decodeF8(d.error_a) : d.error_a;
+        for (let i = 0; i < ts.length; i++){
+          st.seriesA[method_id].push({ x: ts[i], y: ea[i] });
+        }
+      } else {
+        st.seriesA[method_id].push({ x: d.t, y: d.error_a });
+      }
 
       const now = performance.now();
       if (now - st.lastDraw > 220){